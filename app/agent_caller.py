@@ -6,18 +6,238 @@ alignment with production behavior.
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import logging
 import os
 import uuid
-from typing import Any, Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 try:
     import httpx  # type: ignore
 except ImportError:
     httpx = None
 
+try:
+    import h2  # type: ignore  # noqa: F401  (enables httpx HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from pydantic import TypeAdapter
+
 from .models import AgentMetadata, AgentRequest, AgentResponse, ErrorModel, OutputModel
 
+logger = logging.getLogger(__name__)
+
+# Pending calls to idempotent agents, keyed by call fingerprint
+# (see _coalesce_key), so identical concurrent requests share one round-trip.
+_inflight: Dict[str, "asyncio.Task[AgentResponse]"] = {}
+
+# Context entries left out of that fingerprint: the per-request timestamp
+# would otherwise keep concurrent queries from ever matching, and uploads are
+# hashed separately. user_id/conversation_id stay in so users never share replies.
+_UNKEYED_CONTEXT = {"timestamp", "file_uploads"}
+
+# Encodes handshakes directly to UTF-8 JSON bytes (model_dump_json returns a
+# str that httpx would then copy again while encoding the request body).
+_HANDSHAKE_ADAPTER = TypeAdapter(AgentRequest)
+
+# Connection pool sizing for the shared client; per-agent timeouts are applied
+# on each request so one pool can serve every worker.
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_MAX_CONNECTIONS = 100
+HTTP_KEEPALIVE_EXPIRY_S = 30
+
+
+def create_http_client() -> "httpx.AsyncClient":
+    """
+    Build the long-lived pooled client shared by all agent calls. HTTP/2 is
+    used when h2 is installed so concurrent calls to one host multiplex over
+    a single connection; servers without h2 are negotiated down to HTTP/1.1.
+    """
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            max_connections=HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+        ),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    )
+
+
+@asynccontextmanager
+async def _borrow_client(
+    client: Optional["httpx.AsyncClient"], timeout: float
+) -> AsyncIterator["httpx.AsyncClient"]:
+    """Yield the shared client, or a short-lived one when none was provided."""
+    if client is not None:
+        yield client
+        return
+    async with httpx.AsyncClient(timeout=timeout) as owned:
+        yield owned
+
+
+async def _post_to_agent(
+    agent_meta: AgentMetadata,
+    request_id: str,
+    body: bytes,
+    text: str,
+    client: Optional["httpx.AsyncClient"],
+) -> AgentResponse:
+    """POST the encoded handshake to an HTTP worker and map the reply to an AgentResponse."""
+    try:
+        timeout = agent_meta.timeout_ms / 1000
+        async with _borrow_client(client, timeout) as http:
+            # Special handling for budget_tracker_agent - it expects {"query": "..."} format
+            if agent_meta.name == "budget_tracker_agent":
+                payload = {"query": text}
+                logger.info("Calling %s with payload: %s", agent_meta.name, payload)
+                request_body = {"json": payload}
+            else:
+                request_body = {
+                    "content": body,
+                    "headers": {"Content-Type": "application/json"},
+                }
+
+            resp = await http.post(agent_meta.endpoint, timeout=timeout, **request_body)
+            logger.info("%s response status: %s", agent_meta.name, resp.status_code)
+            if resp.status_code != 200:
+                return AgentResponse.model_construct(
+                    request_id=request_id,
+                    agent_name=agent_meta.name,
+                    status="error",
+                    error=ErrorModel.model_construct(
+                        type="http_error",
+                        message=f"HTTP {resp.status_code} calling {agent_meta.endpoint}",
+                    ),
+                )
+
+            # Special handling for budget_tracker_agent response format
+            if agent_meta.name == "budget_tracker_agent":
+                try:
+                    resp_data = resp.json()
+                    # Convert budget tracker response to supervisor handshake format
+                    if resp_data.get("success", False):
+                        # Extract the response text or format the data
+                        result_text = resp_data.get("response")
+                        if not result_text:
+                            # If no "response" field, format the key data into a readable string
+                            parts = []
+                            if "remaining" in resp_data:
+                                parts.append(f"Remaining: ${resp_data['remaining']:.2f}")
+                            if "project_name" in resp_data:
+                                parts.append(f"Project: {resp_data['project_name']}")
+                            if "overshoot_risk" in resp_data:
+                                parts.append(f"Overshoot Risk: {resp_data['overshoot_risk']}")
+                            if "recommendations" in resp_data and resp_data["recommendations"]:
+                                parts.append(f"Recommendations: {', '.join(resp_data['recommendations'])}")
+                            result_text = ". ".join(parts) if parts else str(resp_data)
+
+                        return AgentResponse(
+                            request_id=request_id,
+                            agent_name=agent_meta.name,
+                            status="success",
+                            output=OutputModel(
+                                result=result_text,
+                                details=json.dumps(resp_data, indent=2) if resp_data else None,
+                            ),
+                            error=None,
+                        )
+                    else:
+                        # Budget tracker returned success=false or error
+                        error_msg = resp_data.get("error", resp_data.get("message", "Unknown error from budget tracker agent"))
+                        return AgentResponse.model_construct(
+                            request_id=request_id,
+                            agent_name=agent_meta.name,
+                            status="error",
+                            error=ErrorModel.model_construct(
+                                type="agent_error",
+                                message=str(error_msg),
+                            ),
+                        )
+                except Exception as parse_exc:
+                    # If JSON parsing fails, try to return the raw response
+                    logger.error(
+                        "Failed to parse budget_tracker_agent response: %s, raw: %s",
+                        parse_exc,
+                        resp.text[:500],
+                    )
+                    return AgentResponse.model_construct(
+                        request_id=request_id,
+                        agent_name=agent_meta.name,
+                        status="error",
+                        error=ErrorModel.model_construct(
+                            type="parse_error",
+                            message=f"Failed to parse agent response: {str(parse_exc)}",
+                        ),
+                    )
+            else:
+                # Validate straight from the raw bytes; skips building an interim dict.
+                return AgentResponse.model_validate_json(resp.content)
+    except Exception as exc:
+        return AgentResponse.model_construct(
+            request_id=request_id,
+            agent_name=agent_meta.name,
+            status="error",
+            error=ErrorModel.model_construct(type="network_error", message=str(exc)),
+        )
+
+
+def _coalesce_key(
+    agent_name: str,
+    intent: str,
+    text: str,
+    context: Dict[str, Any],
+    file_uploads: List[Dict[str, Any]],
+) -> str:
+    """
+    Fingerprint a call from its inputs rather than its encoded handshake, so
+    file payloads are only hashed, never JSON-encoded a second time.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    stable_context = {k: v for k, v in context.items() if k not in _UNKEYED_CONTEXT}
+    digest.update(json.dumps([agent_name, intent, text, stable_context], sort_keys=True, default=str).encode())
+    for f in file_uploads:
+        base64_data = f.get("base64_data") or ""
+        digest.update(json.dumps([f.get("filename"), f.get("mime_type"), len(base64_data)]).encode())
+        digest.update(base64_data.encode())
+    return digest.hexdigest()
+
+
+async def _coalesced_post(
+    agent_meta: AgentMetadata,
+    key: str,
+    request_id: str,
+    body: bytes,
+    text: str,
+    client: Optional["httpx.AsyncClient"],
+) -> AgentResponse:
+    """
+    Share one in-flight HTTP call between identical requests (same key, see
+    _coalesce_key) to an idempotent agent. Later callers await the leader's
+    task and get a copy of its reply carrying their own request_id.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_post_to_agent(agent_meta, request_id, body, text, client))
+        _inflight[key] = task
+
+        def _forget(done: "asyncio.Task[AgentResponse]") -> None:
+            if _inflight.get(key) is done:
+                del _inflight[key]
+
+        task.add_done_callback(_forget)
+        # Shield so a cancelled caller does not cancel the call for the others.
+        return await asyncio.shield(task)
+
+    logger.info("Coalescing duplicate call to %s", agent_meta.name)
+    shared = await asyncio.shield(task)
+    return shared.model_copy(update={"request_id": request_id}, deep=True)
+
 
 async def call_agent(
     agent_meta: AgentMetadata,
@@ -25,6 +245,7 @@ async def call_agent(
     text: str,
     context: Dict[str, Any],
     custom_input: Dict[str, Any] = None,
+    client: Optional["httpx.AsyncClient"] = None,
 ) -> AgentResponse:
     """
     Build handshake request and invoke the worker. When endpoints are not real,
@@ -33,9 +254,11 @@ async def call_agent(
     Args:
         custom_input: Optional dict to override default input structure.
                      If provided, it replaces the entire input payload.
+        client: Shared pooled httpx client (see create_http_client). When
+                omitted a one-off client is opened for this call.
     """
 
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4().hex
     
     # Build metadata with file uploads if available
     metadata: Dict[str, Any] = {"language": "en", "extra": {}}
@@ -51,14 +274,14 @@ async def call_agent(
             metadata["mime_type"] = first_file.get("mime_type", "application/octet-stream")
             metadata["filename"] = first_file.get("filename", "uploaded_file")
             
-            # Debug logging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Sending file to {agent_meta.name}: {first_file.get('filename', 'unknown')} ({len(base64_data)} chars base64)")
+            logger.info(
+                "Sending file to %s: %s (%d chars base64)",
+                agent_meta.name,
+                first_file.get("filename", "unknown"),
+                len(base64_data),
+            )
         else:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"File upload found but base64_data is empty for {agent_meta.name}")
+            logger.warning("File upload found but base64_data is empty for %s", agent_meta.name)
             
         # Add support for multiple files in metadata
         metadata["files"] = []
@@ -70,129 +293,45 @@ async def call_agent(
                      "filename": f.get("filename", "uploaded_file")
                  })
     else:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.debug(f"No file uploads in context for {agent_meta.name}")
+        logger.debug("No file uploads in context for %s", agent_meta.name)
     
     handshake = AgentRequest(
         request_id=request_id,
         agent_name=agent_meta.name,
         intent=intent,
         input={"text": text, "metadata": metadata},
-        context=context,
+        # Files already travel in input.metadata; leave the raw uploads out of
+        # the wire context so the base64 payload is not sent twice.
+        context={k: v for k, v in context.items() if k != "file_uploads"},
     )
 
     # Only live HTTP calls are supported; no simulation fallback.
     if agent_meta.type == "http" and agent_meta.endpoint and httpx is not None:
-        try:
-            import logging
-            logger = logging.getLogger(__name__)
-            
-            async with httpx.AsyncClient(timeout=agent_meta.timeout_ms / 1000) as client:
-                # Special handling for budget_tracker_agent - it expects {"query": "..."} format
-                if agent_meta.name == "budget_tracker_agent":
-                    payload = {"query": text}
-                    logger.info(f"Calling {agent_meta.name} with payload: {payload}")
-                else:
-                    payload = handshake.dict()
-                
-                resp = await client.post(agent_meta.endpoint, json=payload)
-                logger.info(f"{agent_meta.name} response status: {resp.status_code}")
-                if resp.status_code != 200:
-                    return AgentResponse(
-                        request_id=request_id,
-                        agent_name=agent_meta.name,
-                        status="error",
-                        error=ErrorModel(
-                            type="http_error",
-                            message=f"HTTP {resp.status_code} calling {agent_meta.endpoint}",
-                        ),
-                    )
-                
-                # Special handling for budget_tracker_agent response format
-                if agent_meta.name == "budget_tracker_agent":
-                    try:
-                        resp_data = resp.json()
-                        # Convert budget tracker response to supervisor handshake format
-                        if resp_data.get("success", False):
-                            # Extract the response text or format the data
-                            result_text = resp_data.get("response")
-                            if not result_text:
-                                # If no "response" field, format the key data into a readable string
-                                parts = []
-                                if "remaining" in resp_data:
-                                    parts.append(f"Remaining: ${resp_data['remaining']:.2f}")
-                                if "project_name" in resp_data:
-                                    parts.append(f"Project: {resp_data['project_name']}")
-                                if "overshoot_risk" in resp_data:
-                                    parts.append(f"Overshoot Risk: {resp_data['overshoot_risk']}")
-                                if "recommendations" in resp_data and resp_data["recommendations"]:
-                                    parts.append(f"Recommendations: {', '.join(resp_data['recommendations'])}")
-                                result_text = ". ".join(parts) if parts else str(resp_data)
-                            
-                            return AgentResponse(
-                                request_id=request_id,
-                                agent_name=agent_meta.name,
-                                status="success",
-                                output=OutputModel(
-                                    result=result_text,
-                                    details=json.dumps(resp_data, indent=2) if resp_data else None,
-                                ),
-                                error=None,
-                            )
-                        else:
-                            # Budget tracker returned success=false or error
-                            error_msg = resp_data.get("error", resp_data.get("message", "Unknown error from budget tracker agent"))
-                            return AgentResponse(
-                                request_id=request_id,
-                                agent_name=agent_meta.name,
-                                status="error",
-                                error=ErrorModel(
-                                    type="agent_error",
-                                    message=str(error_msg),
-                                ),
-                            )
-                    except Exception as parse_exc:
-                        # If JSON parsing fails, try to return the raw response
-                        import logging
-                        logger = logging.getLogger(__name__)
-                        logger.error(f"Failed to parse budget_tracker_agent response: {parse_exc}, raw: {resp.text[:500]}")
-                        return AgentResponse(
-                            request_id=request_id,
-                            agent_name=agent_meta.name,
-                            status="error",
-                            error=ErrorModel(
-                                type="parse_error",
-                                message=f"Failed to parse agent response: {str(parse_exc)}",
-                            ),
-                        )
-                else:
-                    return AgentResponse(**resp.json())
-        except Exception as exc:
-            return AgentResponse(
-                request_id=request_id,
-                agent_name=agent_meta.name,
-                status="error",
-                error=ErrorModel(type="network_error", message=str(exc)),
-            )
+        # Serialize the handshake straight to JSON bytes exactly once; going
+        # through .dict() or a str would copy the base64 payload again.
+        body = _HANDSHAKE_ADAPTER.dump_json(handshake)
+        if agent_meta.idempotent:
+            key = _coalesce_key(agent_meta.name, intent, text, context, file_uploads)
+            return await _coalesced_post(agent_meta, key, request_id, body, text, client)
+        return await _post_to_agent(agent_meta, request_id, body, text, client)
     elif agent_meta.type == "http" and httpx is None:
-        return AgentResponse(
+        return AgentResponse.model_construct(
             request_id=request_id,
             agent_name=agent_meta.name,
             status="error",
-            error=ErrorModel(type="config_error", message="httpx not installed for HTTP agent calls"),
+            error=ErrorModel.model_construct(type="config_error", message="httpx not installed for HTTP agent calls"),
         )
     elif agent_meta.type == "cli":
-        return AgentResponse(
+        return AgentResponse.model_construct(
             request_id=request_id,
             agent_name=agent_meta.name,
             status="error",
-            error=ErrorModel(type="not_implemented", message="CLI agent execution is not implemented"),
+            error=ErrorModel.model_construct(type="not_implemented", message="CLI agent execution is not implemented"),
         )
     else:
-        return AgentResponse(
+        return AgentResponse.model_construct(
             request_id=request_id,
             agent_name=agent_meta.name,
             status="error",
-            error=ErrorModel(type="config_error", message="Agent endpoint/command not configured"),
+            error=ErrorModel.model_construct(type="config_error", message="Agent endpoint/command not configured"),
         )
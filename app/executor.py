@@ -4,8 +4,9 @@ outputs for later synthesis or UI debugging.
 """
 from __future__ import annotations
 
+import asyncio
 import uuid
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     import httpx  # type: ignore
@@ -13,29 +14,15 @@ except ImportError:
     httpx = None
 
 from .agent_caller import call_agent
-from .models import AgentMetadata, AgentRequest, AgentResponse, ErrorModel, Plan, UsedAgentEntry
-from .registry import find_agent_by_name
-
-
-def resolve_input(input_source: str, user_query: str, step_outputs: Dict[int, AgentResponse]) -> str:
-    """Resolve an input_source directive into text for the worker."""
-    if input_source == "user_query":
-        return user_query
-    if input_source.startswith("step:"):
-        parts = input_source.split(":")
-        if len(parts) >= 2:
-            step_id_str = parts[1].split(".")[0]
-            try:
-                step_id = int(step_id_str)
-                prior = step_outputs.get(step_id)
-                if prior and prior.output:
-                    return str(prior.output.result)
-            except ValueError:
-                pass
-    return user_query
-
+from .models import AgentMetadata, AgentRequest, AgentResponse, ErrorModel, Plan, PlanStep, UsedAgentEntry
 
 
+def resolve_input(step: PlanStep, user_query: str, step_outputs: Dict[int, AgentResponse]) -> str:
+    """Resolve a step's input_source into text for the worker."""
+    prior = step_outputs.get(step.source_step) if step.source_step is not None else None
+    if prior and prior.output:
+        return str(prior.output.result)
+    return user_query
 
 
 async def execute_plan(
@@ -43,50 +30,114 @@ async def execute_plan(
     plan: Plan,
     registry: List[AgentMetadata],
     context: Dict[str, Any],
+    client: Optional["httpx.AsyncClient"] = None,
+    registry_by_name: Optional[Dict[str, AgentMetadata]] = None,
 ) -> Tuple[Dict[int, AgentResponse], List[UsedAgentEntry]]:
-    """Execute each planned step in order and capture responses."""
+    """
+    Execute the plan as a dependency graph and capture responses.
+
+    Steps whose input_source does not reference a pending step run together
+    in one asyncio.gather wave, so independent agent calls overlap and total
+    latency follows the critical path rather than the sum of all steps.
+    Pass registry_by_name (agent name -> metadata) to reuse a prebuilt index.
+    """
+    if registry_by_name is None:
+        registry_by_name = {agent.name: agent for agent in registry}
     step_outputs: Dict[int, AgentResponse] = {}
-    used_agents: List[UsedAgentEntry] = []
+    # used_agents entries per planned step (a step's auto-triggered TDA entry
+    # follows it), flattened in step_id order once every wave has finished.
+    entries_by_step: Dict[int, List[UsedAgentEntry]] = {}
 
-    for step in plan.steps:
-        agent_meta = find_agent_by_name(step.agent, registry)
-        text = resolve_input(step.input_source, query, step_outputs)
+    async def trigger_tda() -> Optional[Tuple[AgentMetadata, AgentResponse]]:
+        """Auto-trigger TDA after KnowledgeBaseBuilderAgent successfully creates tasks."""
+        try:
+            tda_meta = registry_by_name["task_dependency_agent"]
+            # Call TDA with database trigger - it will retrieve tasks from MongoDB
+            tda_response = await call_agent(
+                tda_meta,
+                "task.resolve_dependencies",
+                "",  # Empty text since TDA uses trigger
+                context,
+                custom_input={"trigger": "database_update"},  # Signal to retrieve from DB
+                client=client,
+            )
+            return tda_meta, tda_response
+        except KeyError:
+            # TDA not found in registry, skip auto-trigger
+            return None
+        except Exception:
+            # TDA call failed, continue without blocking
+            return None
+
+    async def run_step(step: PlanStep):
+        agent_meta = registry_by_name.get(step.agent)
+        if agent_meta is None:
+            raise KeyError(f"Agent {step.agent} not found in registry")
+        text = resolve_input(step, query, step_outputs)
         # Pass file uploads from context to agent caller
-        response = await call_agent(agent_meta, step.intent, text, context)
+        response = await call_agent(agent_meta, step.intent, text, context, client=client)
+        tda = None
+        if (step.agent == "KnowledgeBaseBuilderAgent" and
+                response.status == "success" and
+                step.intent == "create_task"):
+            tda = await trigger_tda()
+        return agent_meta, response, tda
+
+    # Next free step_id for auto-triggered steps. Starts past every planned
+    # step so an extra output never takes the id of a step still pending.
+    next_id = max((step.step_id for step in plan.steps), default=-1) + 1
+
+    def record(step: PlanStep, result) -> None:
+        nonlocal next_id
+        agent_meta, response, tda = result
         step_outputs[step.step_id] = response
-        used_agents.append(
+        entries = entries_by_step.setdefault(step.step_id, [])
+        entries.append(
             UsedAgentEntry(name=agent_meta.name, intent=step.intent, status=response.status)
         )
-        
-        # Auto-trigger TDA after KnowledgeBaseBuilderAgent successfully creates tasks
-        if (step.agent == "KnowledgeBaseBuilderAgent" and 
-            response.status == "success" and 
-            step.intent == "create_task"):
-            try:
-                tda_meta = find_agent_by_name("task_dependency_agent", registry)
-                # Call TDA with database trigger - it will retrieve tasks from MongoDB
-                tda_response = await call_agent(
-                    tda_meta,
-                    "task.resolve_dependencies",
-                    "",  # Empty text since TDA uses trigger
-                    context,
-                    custom_input={"trigger": "database_update"}  # Signal to retrieve from DB
+        if tda is not None:
+            tda_meta, tda_response = tda
+            # Add TDA to outputs with next step_id
+            step_outputs[next_id] = tda_response
+            next_id += 1
+            entries.append(
+                UsedAgentEntry(
+                    name=tda_meta.name,
+                    intent="task.resolve_dependencies",
+                    status=tda_response.status
                 )
-                # Add TDA to outputs with next step_id
-                next_step_id = max(step_outputs.keys()) + 1 if step_outputs else 0
-                step_outputs[next_step_id] = tda_response
-                used_agents.append(
-                    UsedAgentEntry(
-                        name=tda_meta.name,
-                        intent="task.resolve_dependencies",
-                        status=tda_response.status
-                    )
-                )
-            except KeyError:
-                # TDA not found in registry, skip auto-trigger
-                pass
-            except Exception:
-                # TDA call failed, continue without blocking
-                pass
+            )
+
+    # Fast path: single-step plans (the common case) need no dependency graph.
+    if len(plan.steps) == 1:
+        step = plan.steps[0]
+        record(step, await run_step(step))
+        return step_outputs, entries_by_step[step.step_id]
+
+    plan_ids = {step.step_id for step in plan.steps}
+    deps: Dict[int, Optional[int]] = {}
+    for step in plan.steps:
+        dep = step.source_step
+        # References to unknown steps (or to itself) resolve to user_query anyway.
+        deps[step.step_id] = dep if dep in plan_ids and dep != step.step_id else None
+
+    remaining = sorted(plan.steps, key=lambda s: s.step_id)
+    while remaining:
+        ready = [s for s in remaining if deps[s.step_id] is None or deps[s.step_id] in step_outputs]
+        if not ready:
+            # Dependency cycle: run the lowest step_id so execution still progresses.
+            ready = remaining[:1]
+        ready_ids = {s.step_id for s in ready}
+        remaining = [s for s in remaining if s.step_id not in ready_ids]
+
+        results = await asyncio.gather(*(run_step(s) for s in ready), return_exceptions=True)
+        # Let every sibling settle before surfacing an unexpected failure.
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        for step, result in zip(ready, results):
+            record(step, result)
 
+    used_agents = [entry for sid in sorted(entries_by_step) for entry in entries_by_step[sid]]
     return step_outputs, used_agents
@@ -4,11 +4,10 @@ Centralizes file upload parsing and validation logic.
 """
 from __future__ import annotations
 
-import re
 from typing import Dict, List, Optional
 
 # Constants
-FILE_UPLOAD_MARKER_PATTERN = r'\[FILE_UPLOAD:(.+):([^:]+):([^\]]+)\]'
+FILE_UPLOAD_MARKER_PREFIX = '[FILE_UPLOAD:'
 MAX_FILE_SIZE_BASE64 = 25 * 1024 * 1024  # 25MB in base64 (roughly 18.75MB binary)
 SUPPORTED_MIME_TYPES = {
     'text/plain',
@@ -36,20 +35,61 @@ def extract_base64_from_data_url(data_url: str) -> str:
         raise ValueError("Data URL cannot be empty")
     
     # Handle data URL format: data:mime/type;base64,<base64data>
-    if 'base64,' in data_url:
-        return data_url.split('base64,')[1]
-    elif ',' in data_url:
-        # Fallback: split by comma and take last part
-        return data_url.split(',')[-1]
+    # partition/rpartition return the tail directly without building a list
+    _, sep, base64_data = data_url.partition('base64,')
+    if sep:
+        return base64_data
+    _, sep, base64_data = data_url.rpartition(',')
+    if sep:
+        # Fallback: take the part after the last comma
+        return base64_data
+    # Assume it's already just base64 data
+    return data_url
+
+
+def _split_marker_fields(query_text: str, pos: int) -> Optional[tuple[str, str, str, int]]:
+    """
+    Split the fields of a [FILE_UPLOAD:<data_url>:<filename>:<mime_type>] marker
+    whose body starts at pos, returning them with the index just past the ']'.
+    
+    Fields are found from the front: the data URL ends at the first ':' after
+    its ',' (base64 never contains ':' or ']'), the filename at the next ':',
+    and the mime type at the following ']'. Filenames may therefore contain
+    ']' but not ':'. Returns None if the marker is malformed.
+    """
+    if query_text.startswith('data:', pos):
+        comma = query_text.find(',', pos)
+        if comma < 0:
+            return None
+        data_end = query_text.find(':', comma)
     else:
-        # Assume it's already just base64 data
-        return data_url
+        data_end = query_text.find(':', pos)  # Bare base64 without a data URL prefix
+    if data_end < 0:
+        return None
+    name_end = query_text.find(':', data_end + 1)
+    if name_end < 0:
+        return None
+    close = query_text.find(']', name_end + 1)
+    if close < 0:
+        return None
+    
+    data_url_part = query_text[pos:data_end]
+    filename = query_text[data_end + 1:name_end]
+    mime_type = query_text[name_end + 1:close]
+    if not data_url_part or not filename or not mime_type:
+        return None
+    if ']' in data_url_part or ':' in mime_type:
+        return None  # Ran into a neighbouring marker
+    return data_url_part, filename, mime_type, close + 1
 
 
 def parse_file_upload_markers(query_text: str) -> tuple[str, List[Dict[str, str]]]:
     """
     Parse file upload markers from query text and extract file data.
     
+    Markers are located with a single linear scan (no regex), which keeps
+    multi-MB embedded data URLs from being re-scanned once per marker.
+    
     Args:
         query_text: Query text that may contain [FILE_UPLOAD:...] markers
         
@@ -58,46 +98,44 @@ def parse_file_upload_markers(query_text: str) -> tuple[str, List[Dict[str, str]
         Each file upload dict contains: base64_data, filename, mime_type
     """
     file_uploads: List[Dict[str, str]] = []
-    clean_query = query_text
-    matches = re.findall(FILE_UPLOAD_MARKER_PATTERN, query_text)
+    out: List[str] = []
+    idx = 0
     
-    for match in matches:
-        data_url_part = match[0]
-        filename = match[1]
-        mime_type = match[2]
+    while True:
+        start = query_text.find(FILE_UPLOAD_MARKER_PREFIX, idx)
+        if start < 0:
+            break
+        fields = _split_marker_fields(query_text, start + len(FILE_UPLOAD_MARKER_PREFIX))
+        if fields is None:
+            # Not a well-formed marker; keep its text and scan past the prefix
+            out.append(query_text[idx:start + 1])
+            idx = start + 1
+            continue
+        
+        data_url_part, filename, mime_type, marker_end = fields
+        out.append(query_text[idx:start])
+        idx = marker_end
         
         try:
             base64_data = extract_base64_from_data_url(data_url_part)
-            
-            # Validate file upload
-            if not base64_data:
-                continue  # Skip empty files
-                
-            if len(base64_data) > MAX_FILE_SIZE_BASE64:
-                continue  # Skip files that are too large
-                
-            file_uploads.append({
-                'base64_data': base64_data,
-                'filename': filename,
-                'mime_type': mime_type
-            })
-            
-            # Remove marker from query text
-            escaped_pattern = (
-                r'\[FILE_UPLOAD:' + 
-                re.escape(data_url_part) + 
-                r':' + 
-                re.escape(filename) + 
-                r':' + 
-                re.escape(mime_type) + 
-                r'\]'
-            )
-            clean_query = re.sub(escaped_pattern, f'[Uploaded file: {filename}]', clean_query)
-        except (ValueError, IndexError) as e:
-            # Log error but continue processing
+        except ValueError:
+            base64_data = ''
+        
+        # Skip empty files and files that are too large, leaving the marker in place
+        if not base64_data or len(base64_data) > MAX_FILE_SIZE_BASE64:
+            out.append(query_text[start:marker_end])
             continue
+        
+        file_uploads.append({
+            'base64_data': base64_data,
+            'filename': filename,
+            'mime_type': mime_type
+        })
+        # Replace marker in query text
+        out.append(f'[Uploaded file: {filename}]')
     
-    return clean_query, file_uploads
+    out.append(query_text[idx:])
+    return ''.join(out), file_uploads
 
 
 def validate_file_upload(file_upload: Dict[str, str]) -> bool:
@@ -7,7 +7,7 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class FrontendOptions(BaseModel):
@@ -91,6 +91,18 @@ class AgentMetadata(BaseModel):
     command: Optional[str] = None
     healthcheck: Optional[str] = None
     timeout_ms: int = 5000
+    # Safe to share one in-flight call between identical requests.
+    idempotent: bool = False
+
+
+def _parse_source_step(input_source: str) -> Optional[int]:
+    """Return the step_id an input_source reads from, or None for user_query/constants."""
+    if not input_source.startswith("step:"):
+        return None
+    try:
+        return int(input_source.split(":")[1].split(".")[0])
+    except ValueError:
+        return None
 
 
 class PlanStep(BaseModel):
@@ -99,6 +111,17 @@ class PlanStep(BaseModel):
     intent: str
     input_source: str  # "user_query" or "step:X.output.result"
 
+    # Parsed once at construction so execution never re-parses input_source.
+    _source_step: Optional[int] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._source_step = _parse_source_step(self.input_source)
+
+    @property
+    def source_step(self) -> Optional[int]:
+        """The step whose output feeds this step, or None for the user query."""
+        return self._source_step
+
 
 class Plan(BaseModel):
     steps: List[PlanStep]
@@ -7,7 +7,9 @@ from __future__ import annotations
 
 import json
 import os
-from typing import List, Optional
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 import logging
 
 try:
@@ -65,6 +67,40 @@ def _get_openrouter_client():
 
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "google/gemini-2.5-flash-lite")
 
+# Short-lived plan cache keyed by (query, registry fingerprint). Set
+# PLAN_CACHE_TTL_S=0 to always ask the planner.
+PLAN_CACHE_TTL_S = float(os.getenv("PLAN_CACHE_TTL_S", "300"))
+PLAN_CACHE_MAXSIZE = 1024
+_PLAN_CACHE: "OrderedDict[Tuple[str, str], Tuple[float, Plan]]" = OrderedDict()
+
+
+def get_cached_plan(query: str, registry_hash: str) -> Optional[Plan]:
+    """Return a still-fresh cached plan for this query, or None."""
+    if PLAN_CACHE_TTL_S <= 0:
+        return None
+    key = (query, registry_hash)
+    entry = _PLAN_CACHE.get(key)
+    if entry is None:
+        return None
+    stored_at, plan = entry
+    if time.monotonic() - stored_at > PLAN_CACHE_TTL_S:
+        del _PLAN_CACHE[key]
+        return None
+    _PLAN_CACHE.move_to_end(key)
+    return plan
+
+
+def cache_plan(query: str, registry_hash: str, plan: Plan) -> None:
+    """Remember a plan, evicting the least recently used entry when full."""
+    # Empty plans may come from a transient LLM failure; don't pin those.
+    if PLAN_CACHE_TTL_S <= 0 or not plan.steps:
+        return
+    key = (query, registry_hash)
+    _PLAN_CACHE[key] = (time.monotonic(), plan)
+    _PLAN_CACHE.move_to_end(key)
+    while len(_PLAN_CACHE) > PLAN_CACHE_MAXSIZE:
+        _PLAN_CACHE.popitem(last=False)
+
 
 def plan_tools_with_llm(query: str, registry: List[AgentMetadata], history: Optional[List] = None) -> Plan:
     """Ask an LLM to propose a tool plan; fall back to a safe default or out-of-scope."""
@@ -4,6 +4,7 @@ capabilities and (b) look up connection details when calling a worker.
 """
 from __future__ import annotations
 
+import hashlib
 import os
 from typing import List
 
@@ -23,6 +24,7 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://spm-email-priority-agent.onrender.com/handle",
             healthcheck="https://spm-email-priority-agent.onrender.com/health",
             timeout_ms=40000,
+            idempotent=True,
         ),
         AgentMetadata(
             name="document_summarizer_agent",
@@ -32,6 +34,7 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="http://5.161.59.136:8000/api/agent/execute",
             healthcheck="http://5.161.59.136:8000/health",
             timeout_ms=30000,
+            idempotent=True,
         ),
         AgentMetadata(
             name="meeting_followup_agent",
@@ -107,6 +110,7 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://deadlinegaurdianagent-production.up.railway.app/handle",
             healthcheck="https://deadlinegaurdianagent-production.up.railway.app/health",
             timeout_ms=30000,
+            idempotent=True,
         ),
         AgentMetadata(
             name="focus_enforcer_agent",
@@ -181,6 +185,7 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://document-reviewer-agent.onrender.com/handle",
             healthcheck="https://document-reviewer-agent.onrender.com/health",
             timeout_ms=60000,
+            idempotent=True,
         ),
     ]
 
@@ -190,3 +195,11 @@ def find_agent_by_name(name: str, registry: List[AgentMetadata]) -> AgentMetadat
         if agent.name == name:
             return agent
     raise KeyError(f"Agent {name} not found in registry")
+
+
+def registry_fingerprint(registry: List[AgentMetadata]) -> str:
+    """Stable hash of the registry contents, used to key cached plans."""
+    digest = hashlib.blake2b(digest_size=16)
+    for agent in registry:
+        digest.update(agent.model_dump_json().encode())
+    return digest.hexdigest()
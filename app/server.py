@@ -4,9 +4,11 @@ and health. The heavy lifting lives in other modules to keep concerns separated.
 """
 from __future__ import annotations
 
+import asyncio
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Dict
+from typing import Dict, List
 
 from fastapi import FastAPI, HTTPException
 import logging
@@ -18,23 +20,45 @@ try:
 except ImportError:
     httpx = None
 
+from .agent_caller import create_http_client
 from .answer import compose_final_answer
 from .conversation import append_turn, get_history
 from .executor import execute_plan
 from .general import handle_general_query
 from .file_utils import normalize_file_uploads
-from .models import FrontendRequest, SupervisorResponse
-from .planner import plan_tools_with_llm
-from .registry import load_registry
+from .models import AgentMetadata, FrontendRequest, SupervisorResponse
+from .planner import cache_plan, get_cached_plan, plan_tools_with_llm
+from .registry import load_registry, registry_fingerprint
 from .web import render_home, render_agents_page, render_query_page, render_tasks_page
 from .models import AgentResponse
 
+# Queries longer than this (typically carrying inline base64 file markers) are
+# parsed in a worker thread so the scan does not stall the event loop.
+OFFLOAD_QUERY_CHARS = 1_000_000
+
 
 def build_app() -> FastAPI:
     # Basic logging setup for planner debugging; in production replace with structured logging.
     if not logging.getLogger().handlers:
         logging.basicConfig(level=logging.INFO)
-    app = FastAPI(title="Supervisor Agent Demo")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # One pooled client for all agent calls so keep-alive connections are
+        # reused across steps and requests instead of re-handshaking each time.
+        app.state.http_client = create_http_client() if httpx is not None else None
+        try:
+            yield
+        finally:
+            if app.state.http_client is not None:
+                await app.state.http_client.aclose()
+
+    app = FastAPI(title="Supervisor Agent Demo", lifespan=lifespan)
+    # The registry is static for the process lifetime; build it and the
+    # name index once instead of on every request.
+    app.state.registry = load_registry()
+    app.state.registry_by_name = {agent.name: agent for agent in app.state.registry}
+    app.state.registry_hash = registry_fingerprint(app.state.registry)
 
     @app.get("/")
     async def home():
@@ -42,7 +66,7 @@ def build_app() -> FastAPI:
 
     @app.get("/agents")
     async def view_agents():
-        return render_agents_page(load_registry())
+        return render_agents_page(app.state.registry)
 
     @app.get("/query")
     async def view_query():
@@ -52,9 +76,11 @@ def build_app() -> FastAPI:
     async def view_tasks():
         return render_tasks_page()
 
-    @app.get("/api/agents")
-    async def list_agents():
-        return [agent.dict() for agent in load_registry()]
+    @app.get("/api/agents", response_model=List[AgentMetadata])
+    async def list_agents() -> List[AgentMetadata]:
+        # With a response model FastAPI serializes straight to JSON bytes via
+        # Pydantic, skipping the jsonable_encoder + json.dumps pass.
+        return app.state.registry
 
     @app.get("/api/tasks")
     async def list_tasks():
@@ -81,8 +107,8 @@ def build_app() -> FastAPI:
         if not payload.query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
 
-        registry = load_registry()
-        conversation_id = payload.conversation_id or str(uuid.uuid4())
+        registry = app.state.registry
+        conversation_id = payload.conversation_id or uuid.uuid4().hex
         history = get_history(conversation_id)
 
         # Normalize file uploads: prefer structured field, fallback to query text parsing
@@ -98,7 +124,12 @@ def build_app() -> FastAPI:
                 for fu in payload.file_uploads
             ]
         
-        query_text, file_uploads = normalize_file_uploads(structured_uploads, payload.query)
+        if len(payload.query) > OFFLOAD_QUERY_CHARS:
+            query_text, file_uploads = await asyncio.to_thread(
+                normalize_file_uploads, structured_uploads, payload.query
+            )
+        else:
+            query_text, file_uploads = normalize_file_uploads(structured_uploads, payload.query)
         
         # Debug: Log file uploads if present
         if file_uploads:
@@ -112,14 +143,22 @@ def build_app() -> FastAPI:
             intermediate_results: Dict[str, str] = {}
             append_turn(conversation_id, "user", payload.query)
             append_turn(conversation_id, "assistant", answer)
-            return SupervisorResponse(
+            return SupervisorResponse.model_construct(
                 answer=answer,
                 used_agents=[],
                 intermediate_results=intermediate_results,
                 error=None,
             )
 
-        plan = plan_tools_with_llm(query_text, registry, history=history)
+        # Planner and answer synthesis make blocking LLM calls; run them in a
+        # worker thread so other requests keep being served meanwhile. Only
+        # history-free turns use the plan cache, since follow-ups may depend
+        # on earlier context.
+        plan = get_cached_plan(query_text, app.state.registry_hash) if not history else None
+        if plan is None:
+            plan = await asyncio.to_thread(plan_tools_with_llm, query_text, registry, history=history)
+            if not history:
+                cache_plan(query_text, app.state.registry_hash, plan)
 
         # Normalize context values to strings to satisfy downstream agents.
         context = {
@@ -129,7 +168,15 @@ def build_app() -> FastAPI:
             "file_uploads": file_uploads,  # Pass file uploads to executor
         }
 
-        step_outputs, used_agents = await execute_plan(query_text, plan, registry, context)
+        http_client = getattr(app.state, "http_client", None)
+        step_outputs, used_agents = await execute_plan(
+            query_text,
+            plan,
+            registry,
+            context,
+            client=http_client,
+            registry_by_name=app.state.registry_by_name,
+        )
         # Post-process task dependency output to produce user-friendly names instead of raw JSON.
         async def summarize_dependencies(step_outputs_map: Dict[int, AgentResponse]) -> None:
             dep_responses = [
@@ -202,14 +249,19 @@ def build_app() -> FastAPI:
 
         await summarize_dependencies(step_outputs)
 
-        answer = compose_final_answer(payload.query, step_outputs, history=history)
+        answer = await asyncio.to_thread(compose_final_answer, payload.query, step_outputs, history=history)
 
-        intermediate_results = {f"step_{sid}": step_outputs[sid].dict() for sid in step_outputs}
+        # Keep the AgentResponse models as-is: the route's response_model
+        # serializes them straight to JSON, so dumping each to a dict first
+        # would only add a pass over every step's output.
+        intermediate_results = {f"step_{sid}": resp for sid, resp in step_outputs.items()}
 
         append_turn(conversation_id, "user", payload.query)
         append_turn(conversation_id, "assistant", answer)
 
-        return SupervisorResponse(
+        # Every field is already a validated model or built here, so skip
+        # re-validating the (possibly large) intermediate_results.
+        return SupervisorResponse.model_construct(
             answer=answer,
             used_agents=used_agents,
             intermediate_results=intermediate_results,
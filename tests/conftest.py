@@ -1,7 +1,19 @@
 import os
 import sys
 
+import pytest
+
 # Ensure the repository root is on sys.path for `import app`
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture(autouse=True)
+def clear_plan_cache():
+    """Keep cached plans from leaking between tests."""
+    from app import planner
+
+    planner._PLAN_CACHE.clear()
+    yield
+    planner._PLAN_CACHE.clear()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+from app import agent_caller
+from app.agent_caller import call_agent
+from app.models import AgentMetadata
+
+
+class FakeResp:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeClient:
+    def __init__(self):
+        self.posts = 0
+
+    async def post(self, url, timeout=None, **kwargs):
+        self.posts += 1
+        await asyncio.sleep(0.01)
+        handshake = json.loads(kwargs["content"])
+        body = {
+            "request_id": handshake["request_id"],
+            "agent_name": handshake["agent_name"],
+            "status": "success",
+            "output": {"result": handshake["input"]["text"]},
+        }
+        return FakeResp(json.dumps(body).encode())
+
+
+def _agent(idempotent):
+    return AgentMetadata(
+        name="echo_agent",
+        description="echo",
+        intents=["echo"],
+        type="http",
+        endpoint="http://agent.invalid/handle",
+        idempotent=idempotent,
+    )
+
+
+def _call_twice(agent, client):
+    async def run():
+        context = {"conversation_id": "c1"}
+        return await asyncio.gather(
+            call_agent(agent, "echo", "hi", context, client=client),
+            call_agent(agent, "echo", "hi", context, client=client),
+        )
+
+    return asyncio.run(run())
+
+
+def test_identical_calls_to_idempotent_agent_are_coalesced():
+    client = FakeClient()
+    first, second = _call_twice(_agent(idempotent=True), client)
+
+    assert client.posts == 1
+    assert first.output.result == second.output.result == "hi"
+    assert first.request_id != second.request_id
+
+
+def test_non_idempotent_agent_calls_are_not_coalesced():
+    client = FakeClient()
+    _call_twice(_agent(idempotent=False), client)
+
+    assert client.posts == 2
+
+
+def test_unconfigured_agent_returns_structured_error():
+    agent = AgentMetadata(name="cli_agent", description="cli", intents=["run"], type="cli")
+    resp = asyncio.run(call_agent(agent, "run", "hi", {}))
+
+    assert resp.status == "error"
+    assert resp.output is None
+    assert resp.model_dump(mode="json")["error"] == {
+        "type": "not_implemented",
+        "message": "CLI agent execution is not implemented",
+    }
+
+
+def test_file_uploads_are_sent_once_in_metadata():
+    sent = {}
+
+    class CapturingClient(FakeClient):
+        async def post(self, url, timeout=None, **kwargs):
+            sent.update(json.loads(kwargs["content"]))
+            return await super().post(url, timeout=timeout, **kwargs)
+
+    upload = {"base64_data": "QUJD", "filename": "a.txt", "mime_type": "text/plain"}
+    context = {"conversation_id": "c1", "file_uploads": [upload]}
+    asyncio.run(call_agent(_agent(idempotent=False), "echo", "hi", context, client=CapturingClient()))
+
+    assert sent["input"]["metadata"]["file_base64"] == "QUJD"
+    assert "file_uploads" not in sent["context"]
+    assert context["file_uploads"] == [upload]
+
+
+def test_file_carrying_idempotent_call_is_encoded_once(monkeypatch):
+    encodes = []
+    adapter = agent_caller._HANDSHAKE_ADAPTER
+
+    class CountingAdapter:
+        def dump_json(self, value, **kwargs):
+            encodes.append(kwargs)
+            return adapter.dump_json(value, **kwargs)
+
+    monkeypatch.setattr(agent_caller, "_HANDSHAKE_ADAPTER", CountingAdapter())
+    upload = {"base64_data": "QUJD" * 1000, "filename": "a.pdf", "mime_type": "application/pdf"}
+    context = {"conversation_id": "c1", "file_uploads": [upload]}
+    asyncio.run(call_agent(_agent(idempotent=True), "echo", "hi", context, client=FakeClient()))
+
+    assert len(encodes) == 1
+
+
+def _query_context(user_id, timestamp):
+    return {"user_id": user_id, "conversation_id": "c1", "timestamp": timestamp}
+
+
+def _call_from_two_queries(user_a, user_b, client):
+    agent = _agent(idempotent=True)
+    # Each query builds its own context, as handle_query does, with its own timestamp
+    ctx_a = _query_context(user_a, "2026-01-01T00:00:00.000001+00:00")
+    ctx_b = _query_context(user_b, "2026-01-01T00:00:00.000002+00:00")
+
+    async def run():
+        return await asyncio.gather(
+            call_agent(agent, "echo", "hi", ctx_a, client=client),
+            call_agent(agent, "echo", "hi", ctx_b, client=client),
+        )
+
+    return asyncio.run(run())
+
+
+def test_concurrent_queries_differing_only_in_timestamp_are_coalesced():
+    client = FakeClient()
+    first, second = _call_from_two_queries("u1", "u1", client)
+
+    assert client.posts == 1
+    assert first.request_id != second.request_id
+
+
+def test_calls_for_different_users_are_not_coalesced():
+    client = FakeClient()
+    _call_from_two_queries("u1", "u2", client)
+
+    assert client.posts == 2
@@ -10,7 +10,7 @@ def test_dependency_response_formatted(monkeypatch):
         "execution_order": ["2", "3", "1", "21", "28"],
     }
 
-    async def fake_execute_plan(query, plan, registry, context):
+    async def fake_execute_plan(query, plan, registry, context, client=None, registry_by_name=None):
         step_outputs = {
             0: AgentResponse(
                 request_id="r1",
@@ -81,3 +81,7 @@ def test_dependency_response_formatted(monkeypatch):
     assert "Execution order tasks" in data["answer"]
     assert "Implement Auth" in data["answer"]
     assert "Tasks with dependencies" in data["answer"]
+    step = data["intermediate_results"]["step_0"]
+    assert step["agent_name"] == "task_dependency_agent"
+    assert step["status"] == "success"
+    assert "Implement Auth" in step["output"]["result"]
@@ -0,0 +1,103 @@
+import asyncio
+
+from app import executor
+from app.models import AgentResponse, OutputModel, Plan, PlanStep
+from app.registry import load_registry
+
+
+def _plan(*sources):
+    return Plan(
+        steps=[
+            PlanStep(step_id=i, agent="email_priority_agent", intent="email.priority.classify", input_source=src)
+            for i, src in enumerate(sources)
+        ]
+    )
+
+
+def test_independent_steps_run_concurrently(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_call_agent(agent_meta, intent, text, context, custom_input=None, client=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return AgentResponse(
+            request_id="r", agent_name=agent_meta.name, status="success", output=OutputModel(result=text)
+        )
+
+    monkeypatch.setattr(executor, "call_agent", fake_call_agent)
+    plan = _plan("user_query", "user_query", "user_query")
+    step_outputs, used_agents = asyncio.run(executor.execute_plan("q", plan, load_registry(), {}))
+
+    assert peak == 3
+    assert sorted(step_outputs) == [0, 1, 2]
+    assert len(used_agents) == 3
+
+
+def test_dependent_step_waits_for_its_input(monkeypatch):
+    calls = []
+
+    async def fake_call_agent(agent_meta, intent, text, context, custom_input=None, client=None):
+        calls.append(text)
+        return AgentResponse(
+            request_id="r", agent_name=agent_meta.name, status="success", output=OutputModel(result=f"out:{text}")
+        )
+
+    monkeypatch.setattr(executor, "call_agent", fake_call_agent)
+    plan = Plan(
+        steps=[
+            PlanStep(
+                step_id=0, agent="email_priority_agent", intent="email.priority.classify",
+                input_source="step:1.output.result",
+            ),
+            PlanStep(step_id=1, agent="deadline_guardian_agent", intent="deadline.monitor", input_source="user_query"),
+        ]
+    )
+    step_outputs, used_agents = asyncio.run(executor.execute_plan("q", plan, load_registry(), {}))
+
+    assert calls == ["q", "out:q"]
+    assert step_outputs[0].output.result == "out:out:q"
+    # used_agents stays in step_id order even though step 1 ran first
+    assert [entry.name for entry in used_agents] == ["email_priority_agent", "deadline_guardian_agent"]
+
+
+def test_single_step_plan_still_triggers_tda(monkeypatch):
+    async def fake_call_agent(agent_meta, intent, text, context, custom_input=None, client=None):
+        return AgentResponse(
+            request_id="r", agent_name=agent_meta.name, status="success", output=OutputModel(result="ok")
+        )
+
+    monkeypatch.setattr(executor, "call_agent", fake_call_agent)
+    plan = Plan(
+        steps=[PlanStep(step_id=0, agent="KnowledgeBaseBuilderAgent", intent="create_task", input_source="user_query")]
+    )
+    step_outputs, used_agents = asyncio.run(executor.execute_plan("q", plan, load_registry(), {}))
+
+    assert [entry.name for entry in used_agents] == ["KnowledgeBaseBuilderAgent", "task_dependency_agent"]
+    assert step_outputs[1].agent_name == "task_dependency_agent"
+
+
+def test_tda_output_does_not_collide_with_pending_step(monkeypatch):
+    async def fake_call_agent(agent_meta, intent, text, context, custom_input=None, client=None):
+        return AgentResponse(
+            request_id="r", agent_name=agent_meta.name, status="success", output=OutputModel(result="ok")
+        )
+
+    monkeypatch.setattr(executor, "call_agent", fake_call_agent)
+    plan = Plan(
+        steps=[
+            PlanStep(step_id=0, agent="KnowledgeBaseBuilderAgent", intent="create_task", input_source="user_query"),
+            PlanStep(
+                step_id=1, agent="email_priority_agent", intent="email.priority.classify",
+                input_source="step:0.output.result",
+            ),
+        ]
+    )
+    step_outputs, used_agents = asyncio.run(executor.execute_plan("q", plan, load_registry(), {}))
+
+    assert step_outputs[1].agent_name == "email_priority_agent"
+    assert step_outputs[2].agent_name == "task_dependency_agent"
+    assert len(used_agents) == 3
@@ -0,0 +1,31 @@
+from app.file_utils import parse_file_upload_markers
+
+
+def test_parse_markers_extracts_files_and_cleans_query():
+    query = (
+        "Summarize [FILE_UPLOAD:data:application/pdf;base64,QUJD:report.pdf:application/pdf] "
+        "and [FILE_UPLOAD:data:text/plain;base64,REVG:notes.txt:text/plain] please"
+    )
+    clean, uploads = parse_file_upload_markers(query)
+
+    assert clean == "Summarize [Uploaded file: report.pdf] and [Uploaded file: notes.txt] please"
+    assert uploads == [
+        {"base64_data": "QUJD", "filename": "report.pdf", "mime_type": "application/pdf"},
+        {"base64_data": "REVG", "filename": "notes.txt", "mime_type": "text/plain"},
+    ]
+
+
+def test_parse_markers_leaves_malformed_markers():
+    query = "Check [FILE_UPLOAD:broken] and [FILE_UPLOAD:data:text/plain;base64,QUJD:a.txt"
+    clean, uploads = parse_file_upload_markers(query)
+
+    assert clean == query
+    assert uploads == []
+
+
+def test_parse_markers_allows_brackets_in_filename():
+    query = "Review [FILE_UPLOAD:data:application/pdf;base64,QUJD:Report [final].pdf:application/pdf] now"
+    clean, uploads = parse_file_upload_markers(query)
+
+    assert clean == "Review [Uploaded file: Report [final].pdf] now"
+    assert uploads == [{"base64_data": "QUJD", "filename": "Report [final].pdf", "mime_type": "application/pdf"}]
@@ -1,7 +1,7 @@
 import pytest
 
-from app.planner import plan_tools_with_llm
-from app.registry import load_registry
+from app.planner import cache_plan, get_cached_plan, plan_tools_with_llm
+from app.registry import load_registry, registry_fingerprint
 
 
 @pytest.fixture(scope="module")
@@ -23,3 +23,15 @@ def test_planner_out_of_scope_when_no_match(registry):
     plan = plan_tools_with_llm("Completely unrelated gibberish qwerty", registry)
     # No heuristics should match; when LLM unavailable, returns empty steps
     assert plan.steps == []
+
+
+def test_plan_cache_round_trip_and_skips_empty_plans(registry):
+    registry_hash = registry_fingerprint(registry)
+    plan = plan_tools_with_llm("Please summarize this document", registry)
+    cache_plan("Please summarize this document", registry_hash, plan)
+    assert get_cached_plan("Please summarize this document", registry_hash) is plan
+    assert get_cached_plan("Please summarize this document", "other-registry") is None
+
+    empty = plan_tools_with_llm("Completely unrelated gibberish qwerty", registry)
+    cache_plan("Completely unrelated gibberish qwerty", registry_hash, empty)
+    assert get_cached_plan("Completely unrelated gibberish qwerty", registry_hash) is None